@@ -0,0 +1,9 @@
+"""Benchmarks for asv. They run against the installed python with
+environment_type "existing", so no network access is needed:
+
+asv run --python=same
+asv compare HEAD~1 HEAD
+
+Results are written to benchmarks/results so they can be committed and
+compared across versions.
+"""
@@ -0,0 +1,29 @@
+"""Benchmarks of the array helpers in starcoder42.funcpy and of importing
+the package"""
+
+import io
+import contextlib
+
+import numpy as np
+import starcoder42 as s
+
+
+class ArrayHelpers:
+    params = [1000, 1000000]
+    param_names = ["size"]
+
+    def setup(self, n):
+        self.array = np.linspace(1., 0., n)
+        self.val = 0.5
+        self.stdout = io.StringIO()
+
+    def time_find_index(self, n):
+        s.find_index(self.array, self.val)
+
+    def time_describe(self, n):
+        with contextlib.redirect_stdout(self.stdout):
+            s.describe(self.array)
+
+
+def timeraw_import_starcoder42():
+    return "import starcoder42"
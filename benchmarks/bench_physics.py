@@ -0,0 +1,125 @@
+"""Benchmarks of the n-body and blackbody routines in starcoder42.physics"""
+
+import numpy as np
+import starcoder42 as s
+
+
+def random_bodies(n, seed=42):
+    """Random masses, positions and velocities of n bodies on the scale of
+    the inner solar system"""
+    rng = np.random.default_rng(seed)
+    masses = rng.random(n) * s.m_sun
+    positions = rng.random((n, 3)) * s.distances["AU"]
+    velocities = rng.random((n, 3)) * 30000.
+    return masses, positions, velocities
+
+
+class NBody:
+    params = [2, 8, 32]
+    param_names = ["n_bodies"]
+
+    def setup(self, n):
+        self.masses, self.positions, self.velocities = random_bodies(n)
+        self.dt = s.times["Days"]
+
+    def time_net_force(self, n):
+        s.net_force(self.masses, self.positions, s.force_gravity)
+
+    def time_calculate_trajectories(self, n):
+        s.calculate_trajectories(self.masses, self.positions,
+                                 self.velocities, 10 * self.dt, self.dt,
+                                 s.force_gravity)
+
+    def time_calculate_energy(self, n):
+        s.calculate_energy(self.masses, self.positions, self.velocities)
+
+
+class Planck:
+    params = [10, 1000, 100000]
+    param_names = ["batch_size"]
+
+    def setup(self, n):
+        self.wavelengths = np.linspace(100, 3000, n)
+
+    def time_planck(self, n):
+        s.planck(self.wavelengths, temp=5800)
+
+
+class BlackbodyColor:
+    params = [1, 10, 100]
+    param_names = ["n_temps"]
+
+    def setup(self, n):
+        self.temps = np.linspace(3000, 30000, n)
+
+    def time_blackbody_color(self, n):
+        s.blackbody_color(self.temps)
+
+
+class Spectrum:
+    params = [250, 25000]
+    param_names = ["n_wavelengths"]
+
+    def setup(self, n):
+        self.wavelengths = np.linspace(350, 750, n)
+        self.fluxes = s.planck(self.wavelengths, temp=5800)
+
+    def time_estimate_rgb(self, n):
+        s.estimate_rgb(self.wavelengths, self.fluxes)
+
+
+class ParticleMesh:
+    params = [32, 128, 100000]
+    param_names = ["n_bodies"]
+
+    def setup(self, n):
+        self.box_size = 10 * s.distances["AU"]
+        self.masses, positions, self.velocities = random_bodies(n)
+        self.positions = positions * 10
+
+    def time_pm_force(self, n):
+        s.pm_force(self.masses, self.positions, box_size=self.box_size,
+                   n_grid=64)
+
+
+class DirectSummation:
+    """net_force on the bodies of ParticleMesh, at the sizes it can reach"""
+    params = [32, 128]
+    param_names = ["n_bodies"]
+    setup = ParticleMesh.setup
+
+    def time_net_force(self, n):
+        s.net_force(self.masses, self.positions, s.force_gravity)
+
+
+class Elementwise:
+    params = [10 ** 4, 10 ** 7]
+    param_names = ["size"]
+
+    def setup(self, n):
+        self.temps = np.linspace(3000., 30000., n)
+        self.wavelengths = np.linspace(100., 3000., n)
+        self.out = np.empty(n)
+
+    def time_stefan_boltzmann(self, n):
+        s.stefan_boltzmann(self.temps, out=self.out)
+
+    def time_planck(self, n):
+        s.planck(self.wavelengths, temp=5800, out=self.out)
+
+    def time_lorentz(self, n):
+        s.lorentz(self.temps / 1e5, out=self.out)
+
+
+class Rebinning:
+    params = [1, 1000]
+    param_names = ["n_spectra"]
+
+    def setup(self, n):
+        self.wavelengths = np.linspace(300., 800., 5000)
+        self.fluxes = np.tile(s.planck(self.wavelengths), (n, 1))
+        self.wavelengths_out = np.linspace(400., 700., 300)
+        s.rebin_matrix(self.wavelengths, self.wavelengths_out)
+
+    def time_rebin_spectra(self, n):
+        s.rebin_spectra(self.wavelengths, self.fluxes, self.wavelengths_out)
@@ -0,0 +1,27 @@
+"""Benchmarks of drawing long trajectories with starcoder42.plotting"""
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import starcoder42 as s
+
+
+class PlotTrajectories:
+    params = [10 ** 4, 10 ** 6]
+    param_names = ["n_times"]
+
+    def setup(self, n):
+        t = np.linspace(0., 100., n)
+        path = np.stack([np.cos(t), np.sin(t), np.zeros(n)], axis=-1)
+        self.positions = np.stack([path, 2 * path, 3 * path], axis=1)
+
+    def teardown(self, n):
+        plt.close("all")
+
+    def time_lttb(self, n):
+        s.plot_trajectories(self.positions, ax=plt.figure().gca())
+
+    def time_minmax(self, n):
+        s.plot_trajectories(self.positions, ax=plt.figure().gca(),
+                            method="minmax")
@@ -26,6 +26,12 @@ from .constants import *
 from .conversions import *
 from .errors import *
 from .plotting import *
+from .fits import *
+from .particle_mesh import *
+from .neighbors import *
+from .collisions import *
+from .spectra import *
+from . import instrument
 
 __version__ = '3.7.8'
 __author__ = "Dylan Gatlin"
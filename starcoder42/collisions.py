@@ -0,0 +1,81 @@
+"""Collision detection and merging for n-body runs with finite body radii.
+Close pairs are found with a uniform grid spatial hash, the cell list of
+neighbors.cell_list_pairs, so each step costs O(N) rather than O(N^2)."""
+
+import numpy as np
+
+from .neighbors import cell_list_pairs
+
+
+def find_collisions(positions, radii):
+    """Finds every pair of bodies that overlap
+    :param positions: (array) Positions of shape N*3
+    :param radii: (array) Radii of shape N
+    :return: (tuple) Arrays i and j of the overlapping pairs, with i < j
+    """
+    radii = np.asarray(radii, dtype=float)
+    i, j = cell_list_pairs(positions, 2 * radii.max())
+    d = positions[j] - positions[i]
+    touching = np.einsum("ij,ij->i", d, d) < (radii[i] + radii[j]) ** 2
+    return i[touching], j[touching]
+
+
+def compact(keep, *arrays):
+    """Moves the kept rows of each array to its front in place
+    :param keep: (array) Boolean mask of the rows to keep
+    :param arrays: Arrays with len(keep) rows
+    :return: (list) Views of the first keep.sum() rows of each array
+    """
+    n = np.count_nonzero(keep)
+    views = []
+    for a in arrays:
+        a[:n] = a[keep]
+        views.append(a[:n])
+    return views
+
+
+def merge_collisions(masses, positions, velocities, radii, ids, time=0.,
+                     merges=None):
+    """Merges every overlapping pair of bodies, conserving mass and momentum.
+    The merged body is placed at the center of mass, and its radius conserves
+    volume. The heavier body keeps its id, and the lighter body is removed by
+    compacting all the arrays in place. A body is only merged once per call,
+    so a third body touching a merged pair is merged on the next call.
+
+    Inputs:
+    masses: (array) Masses of shape N, modified in place
+    positions: (array) Positions of shape N*3, modified in place
+    velocities: (array) Velocities of shape N*3, modified in place
+    radii: (array) Radii of shape N, modified in place
+    ids: (array) Original indices of the bodies, modified in place
+    time: (float) The time of the collisions, for the merge log
+    merges: (list) A list that each merge event is appended to
+
+    Returns:
+    masses, positions, velocities, radii, ids, shortened to the survivors
+    """
+    i, j = find_collisions(positions, radii)
+    if len(i) == 0:
+        return masses, positions, velocities, radii, ids
+    keep = np.ones(len(masses), dtype=bool)
+    # Pairs were found with the positions before any merge, so each body
+    # takes part in at most one merge per call
+    merged = np.zeros(len(masses), dtype=bool)
+    for a, b in zip(i, j):
+        if merged[a] or merged[b]:
+            continue
+        merged[a] = merged[b] = True
+        if masses[b] > masses[a]:
+            a, b = b, a
+        total = masses[a] + masses[b]
+        positions[a] = (masses[a] * positions[a]
+                        + masses[b] * positions[b]) / total
+        velocities[a] = (masses[a] * velocities[a]
+                         + masses[b] * velocities[b]) / total
+        radii[a] = np.cbrt(radii[a] ** 3 + radii[b] ** 3)
+        masses[a] = total
+        keep[b] = False
+        if merges is not None:
+            merges.append({"time": time, "survivor": int(ids[a]),
+                           "absorbed": int(ids[b]), "mass": total})
+    return compact(keep, masses, positions, velocities, radii, ids)
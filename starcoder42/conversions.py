@@ -1,5 +1,8 @@
 """Conversion factors and conversion functions"""
 
+import re
+from functools import lru_cache
+
 import numpy as np
 
 # Masses
@@ -111,3 +114,106 @@ def wavenum2wavelen(v):
 def wavelen2wavenum(l):
     """Converts from wavelength in nm to wavenumber in cm^-1"""
     return 1 / l * 1.0e7
+
+
+# Unit Conversion Engine
+# Every unit is a factor to SI and its dimensions as powers of
+# (mass, length, time, current)
+_mass = (1, 0, 0, 0)
+_length = (0, 1, 0, 0)
+_time = (0, 0, 1, 0)
+units = {"Kilograms": (1., _mass),
+         "Grams": (1.e-3, _mass),
+         "Meters": (1., _length),
+         "Centimeters": (1.e-2, _length),
+         "Seconds": (1., _time),
+         "Joules": (1., (1, 2, -2, 0)),
+         "Ergs": (CGS["Ergs"], (1, 2, -2, 0)),
+         "Electronvolts": (evtoj, (1, 2, -2, 0)),
+         "Teslas": (1., (1, 0, -2, -1)),
+         "Gauss": (CGS["Gauss"], (1, 0, -2, -1))
+         }
+units.update({name: (factor, _mass) for name, factor in masses.items()})
+units.update({name: (factor, _length) for name, factor in distances.items()})
+units.update({name: (factor, _time) for name, factor in times.items()})
+
+# Temperatures are affine, kelvins = scale * t + offset
+temperatures = {"Kelvin": (1., 0.),
+                "Celsius": (1., 273.15),
+                "Fahrenheit": (5. / 9., 459.67 * 5. / 9.)
+                }
+
+
+def _parse_unit(unit):
+    """Resolves a compound unit like "Kilometers/Hours" or "Meters*Seconds^-2"
+    into a single factor to SI and its dimensions"""
+    factor = 1.
+    dims = (0, 0, 0, 0)
+    for sign, token in re.findall(r"([*/]?)\s*([^*/\s]+)", unit):
+        name, _, power = token.partition("^")
+        power = float(power) if power else 1.
+        if sign == "/":
+            power = -power
+        if name not in units:
+            raise KeyError("Unknown unit {!r} in {!r}".format(name, unit))
+        f, d = units[name]
+        factor *= f ** power
+        dims = tuple(a + b * power for a, b in zip(dims, d))
+    return factor, dims
+
+
+@lru_cache(maxsize=None)
+def conversion(from_unit, to_unit):
+    """Resolves a pair of units into the affine transform between them, so
+    that converted = scale * values + offset. The result is cached, so looking
+    up the same pair again is free.
+
+    Inputs:
+    from_unit: (str) The unit to convert from, either a key of units or
+        temperatures, or a compound like "Kilometers/Hours" or "Parsecs^3"
+    to_unit: (str) The unit to convert to, in the same form
+
+    Returns:
+    (scale, offset), offset is 0 for everything but temperatures
+    """
+    if from_unit in temperatures or to_unit in temperatures:
+        try:
+            s1, o1 = temperatures[from_unit]
+            s2, o2 = temperatures[to_unit]
+        except KeyError:
+            raise ValueError("Cannot convert {} to {}".format(from_unit,
+                                                              to_unit))
+        return s1 / s2, (o1 - o2) / s2
+    f1, d1 = _parse_unit(from_unit)
+    f2, d2 = _parse_unit(to_unit)
+    if d1 != d2:
+        raise ValueError("Cannot convert {} to {}, their dimensions differ"
+                         "".format(from_unit, to_unit))
+    return f1 / f2, 0.
+
+
+def convert(values, from_unit, to_unit, out=None, inplace=False):
+    """Converts values between two units with at most one pass for the scale
+    and one for the offset. Compound units are folded into a single factor by
+    conversion, so no temporaries are made for each part of the unit.
+
+    Inputs:
+    values: (float or array) The values to convert
+    from_unit: (str) The unit of values, see conversion
+    to_unit: (str) The unit to convert to
+    out: (array) An optional buffer to write the result into
+    inplace: (bool) Write the result back into values, which must be a float
+        array
+
+    Returns:
+    The converted values, which is out or values if either was used
+    """
+    scale, offset = conversion(from_unit, to_unit)
+    if inplace:
+        out = values
+    if out is None and np.ndim(values) == 0:
+        return values * scale + offset
+    out = np.multiply(values, scale, out=out)
+    if offset != 0:
+        np.add(out, offset, out=out)
+    return out
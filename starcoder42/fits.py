@@ -0,0 +1,310 @@
+"""A lightweight FITS reader. Headers are parsed block by block without
+touching the data, and data units are returned as read-only np.memmap views
+so nothing is copied until you index into them. This is the python version of
+the get_header stub in ftarcoder42's ffitsio."""
+
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+block_size = 2880
+card_size = 80
+
+# FITS is always big-endian, so the dtypes carry an explicit byte order
+bitpix_dtypes = {8: "u1",
+                 16: ">i2",
+                 32: ">i4",
+                 64: ">i8",
+                 -32: ">f4",
+                 -64: ">f8"
+                 }
+bintable_dtypes = {"L": "S1",
+                   "X": "u1",
+                   "B": "u1",
+                   "I": ">i2",
+                   "J": ">i4",
+                   "K": ">i8",
+                   "A": "S",
+                   "E": ">f4",
+                   "D": ">f8",
+                   "C": ">c8",
+                   "M": ">c16",
+                   "P": ">i4",
+                   "Q": ">i8"
+                   }
+
+_commentary = ("COMMENT", "HISTORY", "")
+_header_cache = {}
+
+
+def _parse_value(text):
+    """Converts the value field of a card into a python object. Strings keep
+    their trailing ampersand so that CONTINUE cards can be joined."""
+    text = text.strip()
+    if text.startswith("'"):
+        value = []
+        i = 1
+        while i < len(text):
+            if text[i] == "'":
+                if text[i + 1:i + 2] == "'":
+                    value.append("'")
+                    i += 2
+                    continue
+                break
+            value.append(text[i])
+            i += 1
+        return "".join(value).rstrip()
+    text = text.split("/")[0].strip()
+    if text == "T":
+        return True
+    elif text == "F":
+        return False
+    elif text == "":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text.replace("D", "E"))
+    except ValueError:
+        return text
+
+
+def _parse_card(card, header):
+    """Adds a single 80 character card to header. Returns False once the END
+    card has been reached."""
+    key = card[:8].strip()
+    if key == "END":
+        return False
+    if key in _commentary:
+        header.setdefault(key, []).append(card[8:].rstrip())
+    elif key == "CONTINUE":
+        # A CONTINUE card with nothing to continue is ignored
+        last = list(header)[-1] if header else None
+        previous = header.get(last)
+        value = _parse_value(card[8:])
+        if isinstance(previous, str) and previous.endswith("&"):
+            header[last] = previous[:-1] + value
+    elif card[8:10] == "= ":
+        header[key] = _parse_value(card[10:])
+    return True
+
+
+def _read_header(f):
+    """Reads one header from the open file f, leaving the file at the start
+    of the data unit. Returns None at the end of the file."""
+    header = {}
+    reading = True
+    while reading:
+        block = f.read(block_size)
+        if len(block) < block_size:
+            if header:
+                raise ValueError("Header of {} ends without an END card"
+                                 "".format(f.name))
+            return None
+        block = block.decode("ascii", errors="replace")
+        for i in range(0, block_size, card_size):
+            reading = _parse_card(block[i:i + card_size], header)
+            if not reading:
+                break
+    return header
+
+
+def data_size(header):
+    """The size in bytes of the data unit described by header, without the
+    padding to the next 2880 byte block.
+    :param header: (dict) A header from read_header
+    :return: (int) Number of bytes of data
+    """
+    naxis = header.get("NAXIS", 0)
+    if naxis == 0:
+        return 0
+    n = 1
+    for i in range(1, naxis + 1):
+        n *= header["NAXIS{}".format(i)]
+    n += header.get("PCOUNT", 0)
+    n *= header.get("GCOUNT", 1)
+    return n * abs(header["BITPIX"]) // 8
+
+
+def _padded(n_bytes):
+    return -(-n_bytes // block_size) * block_size
+
+
+def iter_hdus(filename):
+    """Walks every header data unit of a FITS file, reading only the headers.
+    :param filename: (str or Path) The FITS file
+    :return: A generator of (header, data_offset, data_size) tuples
+    """
+    with open(filename, "rb") as f:
+        while True:
+            header = _read_header(f)
+            if header is None:
+                return
+            offset = f.tell()
+            size = data_size(header)
+            yield header, offset, size
+            f.seek(offset + _padded(size))
+
+
+def _find_hdu(filename, hdu):
+    """The header, data offset and data size of one HDU"""
+    for i, found in enumerate(iter_hdus(filename)):
+        if i == hdu:
+            return found
+    raise IndexError("{} has no HDU {}".format(filename, hdu))
+
+
+def read_header(filename, hdu=0):
+    """Reads the header of one HDU of a FITS file. Only the header blocks are
+    read, the data units in between are skipped with a seek.
+
+    Inputs:
+    filename: (str or Path) The FITS file
+    hdu: (int) The index of the HDU, 0 is the primary HDU
+
+    Returns:
+    A dict of the header keywords. COMMENT and HISTORY cards are collected
+    into lists, and CONTINUE cards are joined into their long strings.
+    """
+    return _find_hdu(filename, hdu)[0]
+
+
+def _column_width(tform):
+    """The field width of an ASCII table TFORM like 'F12.4'"""
+    return int(tform.strip()[1:].split(".")[0])
+
+
+def _bintable_format(tform):
+    """Converts a binary table TFORM like '10E' into a numpy format"""
+    tform = tform.strip()
+    i = 0
+    while i < len(tform) and tform[i].isdigit():
+        i += 1
+    repeat = int(tform[:i]) if i else 1
+    code = tform[i]
+    if code == "A":
+        return "S{}".format(repeat)
+    elif code == "X":
+        repeat = (repeat + 7) // 8
+    elif code in "PQ":
+        repeat = 2
+    fmt = bintable_dtypes[code]
+    return fmt if repeat == 1 else "({},){}".format(repeat, fmt)
+
+
+def table_dtype(header):
+    """Builds a structured dtype for the rows of a BINTABLE or TABLE extension.
+    :param header: (dict) The header of the table extension
+    :return: (np.dtype) A dtype whose itemsize is NAXIS1
+    """
+    n_fields = header["TFIELDS"]
+    names = [header.get("TTYPE{}".format(i), "col{}".format(i))
+             for i in range(1, n_fields + 1)]
+    tforms = [header["TFORM{}".format(i)] for i in range(1, n_fields + 1)]
+    if header["XTENSION"].strip() == "TABLE":
+        formats = ["S{}".format(_column_width(t)) for t in tforms]
+        offsets = [header["TBCOL{}".format(i)] - 1
+                   for i in range(1, n_fields + 1)]
+        return np.dtype({"names": names, "formats": formats,
+                         "offsets": offsets, "itemsize": header["NAXIS1"]})
+    formats = [_bintable_format(t) for t in tforms]
+    dtype = np.dtype({"names": names, "formats": formats})
+    assert dtype.itemsize == header["NAXIS1"], \
+        "TFORMs do not add up to NAXIS1 = {}".format(header["NAXIS1"])
+    return dtype
+
+
+def read_data(filename, hdu=0):
+    """Maps the data unit of one HDU of a FITS file into memory. Nothing is
+    read from disk until the returned array is indexed.
+
+    Images are returned in C order, so an image with NAXIS1=x and NAXIS2=y has
+    shape (y, x). Tables are returned as a structured array with one record
+    per row. BSCALE and BZERO are not applied, because that would require a
+    copy. The dtypes are big-endian, so the values are already correct.
+
+    Inputs:
+    filename: (str or Path) The FITS file
+    hdu: (int) The index of the HDU, 0 is the primary HDU
+
+    Returns:
+    A read-only np.memmap, or None if the HDU has no data
+    """
+    return _map_data(filename, *_find_hdu(filename, hdu))
+
+
+def _map_data(filename, header, offset, size):
+    """Maps the data unit described by header at offset, see read_data"""
+    if size == 0:
+        return None
+    xtension = str(header.get("XTENSION", "")).strip()
+    if xtension in ("BINTABLE", "TABLE"):
+        dtype = table_dtype(header)
+        shape = (header["NAXIS2"],)
+    else:
+        dtype = np.dtype(bitpix_dtypes[header["BITPIX"]])
+        shape = tuple(header["NAXIS{}".format(i)]
+                      for i in range(header["NAXIS"], 0, -1))
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset,
+                     shape=shape)
+
+
+def read_fits(filename, hdu=0):
+    """Reads the header and maps the data of one HDU of a FITS file, walking
+    the file only once
+    :param filename: (str or Path) The FITS file
+    :param hdu: (int) The index of the HDU, 0 is the primary HDU
+    :return: (tuple) The header dict and the np.memmap from read_data
+    """
+    header, offset, size = _find_hdu(filename, hdu)
+    return header, _map_data(filename, header, offset, size)
+
+
+def _cached_header(path, hdu):
+    stat = os.stat(path)
+    key = (str(path), hdu)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _header_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        header = read_header(path, hdu)
+    except (OSError, ValueError, IndexError, KeyError, TypeError):
+        header = None
+    _header_cache[key] = (stamp, header)
+    return header
+
+
+def scan_headers(directory, pattern="*.fits", hdu=0, recursive=False,
+                 workers=None):
+    """Reads the headers of every FITS file in a directory in parallel. The
+    headers are cached, and a file is only read again once its modification
+    time or size changes, so rescanning a large directory is cheap.
+
+    Inputs:
+    directory: (str or Path) The directory to scan
+    pattern: (str) A glob pattern for the files
+    hdu: (int) The HDU to read the header from
+    recursive: (bool) Whether to also search subdirectories
+    workers: (int) Number of threads, by default chosen by ThreadPoolExecutor
+
+    Returns:
+    A dict of {path: header}, sorted by path. Files that are empty, truncated
+    or not FITS are kept in the index with a header of None.
+    """
+    directory = Path(directory)
+    paths = sorted(directory.rglob(pattern) if recursive
+                   else directory.glob(pattern))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        headers = pool.map(lambda p: _cached_header(p, hdu), paths)
+        index = dict(zip(paths, headers))
+    return index
+
+
+def clear_header_cache():
+    """Empties the header cache used by scan_headers"""
+    _header_cache.clear()
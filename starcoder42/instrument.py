@@ -0,0 +1,101 @@
+"""Opt-in timers and counters for the simulation routines in physics. It is
+off by default, and each instrumented function only checks instrument.enabled
+when it is off. Turn it on for a block of code with
+
+with s.instrument.profiling() as stats:
+    s.calculate_trajectories(...)
+print(stats())
+
+or for a whole run by setting the environment variable STARCODER42_PROFILE=1
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager
+
+enabled = os.environ.get("STARCODER42_PROFILE", "0") not in ("", "0")
+timers = {}
+counters = {}
+clock = time.perf_counter
+
+
+def reset():
+    """Clears all timers and counters"""
+    timers.clear()
+    counters.clear()
+
+
+def add_time(phase, seconds):
+    """Adds seconds to the timer of phase"""
+    timers[phase] = timers.get(phase, 0.) + seconds
+
+
+def count(name, n=1):
+    """Adds n to the counter name"""
+    counters[name] = counters.get(name, 0) + n
+
+
+@contextmanager
+def timed(phase):
+    """Times the enclosed block as phase, if instrumentation is enabled"""
+    if not enabled:
+        yield
+        return
+    start = clock()
+    try:
+        yield
+    finally:
+        add_time(phase, clock() - start)
+
+
+def report():
+    """Collects the timers and counters, plus a few derived rates.
+    :return: (dict) A dict with "timers", "counters" and "rates" dicts
+    """
+    rates = {}
+    run_time = timers.get("calculate_trajectories", 0.)
+    if run_time > 0:
+        rates["steps_per_second"] = counters.get("steps", 0) / run_time
+    force_time = timers.get("net_force", 0.)
+    if force_time > 0:
+        rates["pairs_per_second"] = (counters.get("pair_interactions", 0)
+                                     / force_time)
+    pm_time = timers.get("pm_force", 0.)
+    if pm_time > 0:
+        rates["particles_per_second"] = (counters.get("particles_deposited",
+                                                      0) / pm_time)
+    return {"timers": dict(timers), "counters": dict(counters),
+            "rates": rates}
+
+
+def to_json(path=None, **kwargs):
+    """Writes report() as JSON
+    :param path: (str or Path) A file to write to. If None, the JSON string
+        is returned instead
+    :param kwargs: Passed on to json.dumps
+    :return: The JSON string if path is None
+    """
+    text = json.dumps(report(), **kwargs)
+    if path is None:
+        return text
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@contextmanager
+def profiling(clear=True):
+    """Enables instrumentation inside a with block and restores the previous
+    state afterwards.
+    :param clear: (bool) Whether to reset the timers and counters first
+    :return: The report function, call it for the results so far
+    """
+    global enabled
+    previous = enabled
+    if clear:
+        reset()
+    enabled = True
+    try:
+        yield report
+    finally:
+        enabled = previous
@@ -0,0 +1,216 @@
+"""A cell-list and Verlet neighbor-list backend for short-range forces. Only
+pairs closer than a cutoff are ever evaluated, so the cost is O(N) instead of
+the O(N^2) of physics.net_force, and the list of pairs is only rebuilt once
+the particles have moved far enough to invalidate it."""
+
+import numpy as np
+
+from .physics import force_electric_mag
+from . import instrument
+
+# Offsets to every cell in a 3x3x3 block
+_cell_offsets = np.array([[i, j, k] for i in (-1, 0, 1) for j in (-1, 0, 1)
+                          for k in (-1, 0, 1)])
+
+
+def _separations(positions, i, j, box_size=None):
+    """Vectors from particle i to particle j, using the nearest periodic
+    image if box_size is given"""
+    d = positions[j] - positions[i]
+    if box_size is not None:
+        d -= box_size * np.round(d / box_size)
+    return d
+
+
+def _lookup(values, table):
+    """The index of each value in the sorted array table, or -1 where the
+    value is not in table"""
+    index = np.searchsorted(table, values)
+    index[index == len(table)] = 0
+    return np.where(table[index] == values, index, -1)
+
+
+def _cell_keys(coords, tables):
+    """Hashes integer cell coordinates of shape N*3 into keys of the occupied
+    cells. Each axis is replaced by its rank among the occupied values, and
+    the ranks are combined one axis at a time, so keys never exceed N^2
+    however far apart the cells are. Coordinates of cells that are not
+    occupied get the key -1.
+    :param coords: (array) Integer cell coordinates of shape N*3
+    :param tables: (tuple) Sorted occupied values of each axis and of the
+        combined first two axes, from _cell_tables
+    :return: (array) Keys of length N
+    """
+    x_table, y_table, xy_table, z_table = tables
+    x = _lookup(coords[:, 0], x_table)
+    y = _lookup(coords[:, 1], y_table)
+    z = _lookup(coords[:, 2], z_table)
+    xy = _lookup(x * len(y_table) + y, xy_table)
+    missing = (x < 0) | (y < 0) | (z < 0) | (xy < 0)
+    return np.where(missing, -1, xy * len(z_table) + z)
+
+
+def _cell_tables(coords):
+    """The sorted occupied values used by _cell_keys"""
+    x_table = np.unique(coords[:, 0])
+    y_table = np.unique(coords[:, 1])
+    z_table = np.unique(coords[:, 2])
+    x = np.searchsorted(x_table, coords[:, 0])
+    y = np.searchsorted(y_table, coords[:, 1])
+    xy_table = np.unique(x * len(y_table) + y)
+    return x_table, y_table, xy_table, z_table
+
+
+def cell_list_pairs(positions, cutoff, box_size=None):
+    """Finds every pair of particles closer than cutoff by binning them into
+    cells of at least cutoff on a side and only comparing neighboring cells.
+    Only occupied cells are stored, in a spatial hash, so the memory and time
+    depend on the number of particles and not on the size of the box.
+
+    Inputs:
+    positions: (array) Particle positions of shape N*3
+    cutoff: (float) The largest separation to keep
+    box_size: (float) Side length of a periodic box with a corner at the
+        origin. If None, the boundaries are open.
+
+    Returns:
+    i, j: (arrays) Indices of each pair, with i < j
+    """
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    if n < 2:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    if box_size is None:
+        cell_size = float(cutoff)
+        coords = np.floor(positions / cell_size).astype(np.int64)
+    else:
+        n_cells = max(int(box_size // cutoff), 1)
+        cell_size = box_size / n_cells
+        coords = np.floor(positions / cell_size).astype(np.int64) % n_cells
+    tables = _cell_tables(coords)
+    keys = _cell_keys(coords, tables)
+    order = np.argsort(keys, kind="stable")
+    cells, starts, counts = np.unique(keys[order], return_index=True,
+                                      return_counts=True)
+
+    pair_i = []
+    pair_j = []
+    for offset in _cell_offsets:
+        neighbor = coords + offset
+        if box_size is not None:
+            neighbor %= n_cells
+        cell = _lookup(_cell_keys(neighbor, tables), cells)
+        i = np.flatnonzero(cell >= 0)
+        cell = cell[i]
+        count = counts[cell]
+        total = count.sum()
+        if total == 0:
+            continue
+        first = np.repeat(starts[cell] - (np.cumsum(count) - count), count)
+        j = order[first + np.arange(total)]
+        i = np.repeat(i, count)
+        keep = i < j
+        pair_i.append(i[keep])
+        pair_j.append(j[keep])
+    if not pair_i:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    i = np.concatenate(pair_i)
+    j = np.concatenate(pair_j)
+    if box_size is not None and n_cells < 3:
+        # Small boxes reach the same cell through more than one offset
+        i, j = np.divmod(np.unique(i * n + j), n)
+    d = _separations(positions, i, j, box_size)
+    close = np.einsum("ij,ij->i", d, d) < cutoff ** 2
+    return i[close], j[close]
+
+
+class NeighborList:
+    """A Verlet neighbor list that can be used as the backend of leapfrog or
+    calculate_trajectories in place of net_force:
+
+    backend = s.NeighborList(charges, cutoff=1e-6, skin=1e-7)
+    s.calculate_trajectories(charges, r, v, t, dt, None, backend=backend)
+
+    Pairs are found within cutoff + skin with cell_list_pairs, and are only
+    found again once some particle has moved more than skin / 2 since the
+    last build. Forces follow the same sign convention as
+    force_electrostatic, magnitude(q1, q2, r) along the vector from particle 1
+    to particle 2.
+
+    :param cutoff: (float) Pairs further apart than this feel no force
+    :param skin: (float) Extra distance kept in the list, by default
+        cutoff / 10. Larger skins rebuild less often but keep more pairs.
+    :param box_size: (float) Side length of a periodic box, or None
+    :param magnitude: (function) The force magnitude of a pair, given arrays
+        of (q1, q2, r). By default Coulomb's law, force_electric_mag. Use a
+        screened law for a smooth cutoff.
+    """
+
+    def __init__(self, cutoff, skin=None, box_size=None,
+                 magnitude=force_electric_mag):
+        self.cutoff = cutoff
+        self.skin = cutoff / 10. if skin is None else skin
+        self.box_size = box_size
+        self.magnitude = magnitude
+        self.pairs = None
+        self.built_positions = None
+        self.n_builds = 0
+
+    def needs_rebuild(self, positions):
+        """Whether any particle has moved more than half the skin since the
+        last build"""
+        if self.pairs is None or \
+                len(positions) != len(self.built_positions):
+            return True
+        d = positions - self.built_positions
+        if self.box_size is not None:
+            d -= self.box_size * np.round(d / self.box_size)
+        return np.einsum("ij,ij->i", d, d).max() > (self.skin / 2) ** 2
+
+    def build(self, positions):
+        """Rebuilds the list of pairs from positions"""
+        if instrument.enabled:
+            start = instrument.clock()
+        self.pairs = cell_list_pairs(positions, self.cutoff + self.skin,
+                                     self.box_size)
+        self.built_positions = positions.copy()
+        self.n_builds += 1
+        if instrument.enabled:
+            instrument.add_time("neighbor_build", instrument.clock() - start)
+            instrument.count("neighbor_builds")
+
+    def __call__(self, charges, positions, algorithm=None):
+        """Computes the force on every particle, with the same signature as
+        net_force. algorithm is ignored, the pair force is self.magnitude.
+        :param charges: (array) Charges, or whatever magnitude expects, of
+            shape N
+        :param positions: (array) Particle positions of shape N*3
+        :param algorithm: Ignored, only here to match net_force
+        :return: An array of forces of shape N*3
+        """
+        if instrument.enabled:
+            start = instrument.clock()
+        positions = np.asarray(positions, dtype=float)
+        charges = np.asarray(charges, dtype=float)
+        if self.needs_rebuild(positions):
+            self.build(positions)
+        i, j = self.pairs
+        d = _separations(positions, i, j, self.box_size)
+        r = np.sqrt(np.einsum("ij,ij->i", d, d))
+        inside = r < self.cutoff
+        i, j, d, r = i[inside], j[inside], d[inside], r[inside]
+        pair_forces = d * (self.magnitude(charges[i], charges[j], r)
+                           / r)[:, np.newaxis]
+        forces = np.zeros_like(positions)
+        for axis in range(3):
+            forces[:, axis] = np.bincount(i, pair_forces[:, axis],
+                                          minlength=len(positions)) \
+                - np.bincount(j, pair_forces[:, axis],
+                              minlength=len(positions))
+        if instrument.enabled:
+            # Timed as net_force, rebuilds included, since it sums the same
+            # pair forces, just without the pairs beyond the cutoff
+            instrument.add_time("net_force", instrument.clock() - start)
+            instrument.count("force_evaluations")
+            instrument.count("pair_interactions", 2 * len(i))
+        return forces
@@ -0,0 +1,121 @@
+"""A particle-mesh gravity solver for periodic boxes. Masses are deposited
+onto a grid with cloud-in-cell weights, the Poisson equation is solved with
+numpy.fft, and the forces are interpolated back to the particles with the
+same weights. The cost is O(N + M log M) for N particles on M cells, instead
+of the O(N^2) of physics.net_force."""
+
+import numpy as np
+
+from .constants import G
+from . import instrument
+
+
+def cic_weights(positions, box_size, n_grid):
+    """Finds the 8 grid cells touched by each particle and its cloud-in-cell
+    weight in each. Positions outside the box are wrapped periodically.
+
+    Inputs:
+    positions: (array) Particle positions of shape N*3
+    box_size: (float) Side length of the periodic box
+    n_grid: (int) Number of cells along each side
+
+    Returns:
+    indices: (array) Flat grid indices of shape 8*N
+    weights: (array) The weights of shape 8*N, summing to 1 for each particle
+    """
+    u = np.asarray(positions, dtype=float) / box_size * n_grid
+    base = np.floor(u)
+    frac = u - base
+    base = base.astype(np.intp)
+    indices = np.empty((8, len(u)), dtype=np.intp)
+    weights = np.empty((8, len(u)))
+    for corner in range(8):
+        offset = np.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+        cell = (base + offset) % n_grid
+        indices[corner] = (cell[:, 0] * n_grid + cell[:, 1]) * n_grid \
+            + cell[:, 2]
+        weights[corner] = np.prod(np.where(offset, frac, 1 - frac), axis=1)
+    return indices.ravel(), weights.ravel()
+
+
+def deposit_mass(masses, positions, box_size, n_grid):
+    """Deposits masses onto a periodic grid with cloud-in-cell weights
+    :param masses: (array) Particle masses of shape N
+    :param positions: (array) Particle positions of shape N*3
+    :param box_size: (float) Side length of the periodic box
+    :param n_grid: (int) Number of cells along each side
+    :return: (array) The mass density, of shape n_grid*n_grid*n_grid
+    """
+    indices, weights = cic_weights(positions, box_size, n_grid)
+    weights *= np.tile(np.asarray(masses, dtype=float), 8)
+    rho = np.bincount(indices, weights=weights, minlength=n_grid ** 3)
+    rho /= (box_size / n_grid) ** 3
+    return rho.reshape((n_grid,) * 3)
+
+
+def poisson_acceleration(rho, box_size):
+    """Solves the Poisson equation del^2 phi = 4 pi G rho in a periodic box
+    with an FFT, then takes -grad(phi) with central differences on the grid.
+    The mean density is removed, as it must be for a periodic box.
+    :param rho: (array) Mass density of shape n*n*n
+    :param box_size: (float) Side length of the periodic box
+    :return: (array) Acceleration of shape 3*n*n*n
+    """
+    n_grid = rho.shape[0]
+    cell = box_size / n_grid
+    k = 2 * np.pi * np.fft.fftfreq(n_grid, d=cell)
+    kz = 2 * np.pi * np.fft.rfftfreq(n_grid, d=cell)
+    kx, ky, kz = np.meshgrid(k, k, kz, indexing="ij", sparse=True)
+    k2 = kx ** 2 + ky ** 2 + kz ** 2
+    k2[0, 0, 0] = 1.
+    phi_k = np.fft.rfftn(rho)
+    phi_k *= -4 * np.pi * G / k2
+    phi_k[0, 0, 0] = 0.
+    phi = np.fft.irfftn(phi_k, s=rho.shape, axes=(0, 1, 2))
+    accel = np.empty((3,) + rho.shape)
+    for axis in range(3):
+        np.subtract(np.roll(phi, 1, axis), np.roll(phi, -1, axis),
+                    out=accel[axis])
+    accel /= 2 * cell
+    return accel
+
+
+def pm_force(masses, positions, algorithm=None, box_size=1., n_grid=64):
+    """Computes the gravitational force on every particle with the
+    particle-mesh method. It has the same signature as physics.net_force so it
+    can be given to leapfrog or calculate_trajectories as the backend, with
+    the box set through functools.partial:
+
+    backend = functools.partial(s.pm_force, box_size=L, n_grid=128)
+    s.calculate_trajectories(m, r, v, t, dt, None, backend=backend)
+
+    Forces are smoothed on the scale of a cell, so the grid should be fine
+    enough to resolve the separations you care about.
+
+    Inputs:
+    masses: (array) Particle masses of shape N
+    positions: (array) Particle positions of shape N*3
+    algorithm: Ignored, only here to match net_force
+    box_size: (float) Side length of the periodic box
+    n_grid: (int) Number of cells along each side
+
+    Returns:
+    An array of forces of shape N*3
+    """
+    if instrument.enabled:
+        start = instrument.clock()
+    masses = np.asarray(masses, dtype=float)
+    rho = deposit_mass(masses, positions, box_size, n_grid)
+    accel = poisson_acceleration(rho, box_size).reshape(3, -1)
+    indices, weights = cic_weights(positions, box_size, n_grid)
+    forces = np.empty((len(masses), 3))
+    for axis in range(3):
+        forces[:, axis] = (accel[axis, indices] * weights).reshape(
+            8, -1).sum(axis=0)
+    forces *= masses[:, np.newaxis]
+    if instrument.enabled:
+        instrument.add_time("pm_force", instrument.clock() - start)
+        instrument.count("force_evaluations")
+        instrument.count("particles_deposited", len(masses))
+        instrument.count("mesh_cells", n_grid ** 3)
+    return forces
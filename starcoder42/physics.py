@@ -1,7 +1,96 @@
 """Functions that have physical meaning"""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 # Local imports
 from .constants import *
+from . import instrument
+
+# Elementwise formulas are evaluated in blocks of this many elements, small
+# enough to stay in cache, spread over this many threads unless their
+# chunk_size and n_threads arguments say otherwise
+_default_chunk_size = 2 ** 16
+_default_n_threads = os.cpu_count() or 1
+# One pool per thread count, shared between calls
+_pools = {}
+
+
+def _pool(n_threads):
+    """The shared thread pool with n_threads workers"""
+    if n_threads not in _pools:
+        _pools[n_threads] = ThreadPoolExecutor(max_workers=n_threads)
+    return _pools[n_threads]
+
+
+def _same_view(a, b):
+    """Whether a and b are views of exactly the same elements"""
+    return a.__array_interface__["data"][0] == \
+        b.__array_interface__["data"][0] and a.strides == b.strides \
+        and a.shape == b.shape
+
+
+def _run_kernel(kernel, o, args, aliased):
+    """Runs kernel on one block. Kernels may read their inputs after writing
+    to o, so if an input is o, the block is computed in a scratch buffer"""
+    if not aliased:
+        kernel(o, *args)
+        return
+    scratch = np.empty_like(o)
+    kernel(scratch, *args)
+    o[...] = scratch
+
+
+def _evaluate(kernel, args, out=None, chunk_size=None, n_threads=None):
+    """Evaluates kernel(out_block, *arg_blocks) over blocks of the broadcast
+    args. The kernels write every step into out_block in place, so no
+    temporaries are made, and numpy releases the GIL inside each ufunc so the
+    blocks run in parallel on a thread pool. out may be one of the inputs, in
+    which case each block goes through a block-sized scratch buffer.
+    :param kernel: (function) Writes its result into its first argument
+    :param args: (tuple) The inputs, arrays or scalars
+    :param out: (array) An optional output array of the broadcast shape
+    :param chunk_size: (int) Elements per block, 2**16 if None
+    :param n_threads: (int) Threads to run the blocks on, by default one per
+        CPU
+    :return: out, or a scalar if every input was a scalar
+    """
+    args = [np.asarray(a) for a in args]
+    shape = np.broadcast(*args).shape
+    scalar = out is None and shape == ()
+    if out is None:
+        out = np.empty(shape, dtype=np.result_type(float, *args))
+    if chunk_size is None:
+        chunk_size = _default_chunk_size
+    if n_threads is None:
+        n_threads = _default_n_threads
+    args = [np.broadcast_to(a, out.shape) for a in args]
+    aliased = False
+    for n, a in enumerate(args):
+        if np.may_share_memory(a, out):
+            if _same_view(a, out):
+                aliased = True
+            else:
+                # Other overlaps could cross blocks, so copy the input
+                args[n] = a.copy()
+    if out.ndim == 0 or out.size <= chunk_size:
+        _run_kernel(kernel, out, args, aliased)
+        return out[()] if scalar else out
+    # Blocks are whole rows along the first axis, so they are always views
+    rows = max(1, chunk_size // (out.size // len(out)))
+    starts = range(0, len(out), rows)
+    if n_threads == 1:
+        for i in starts:
+            _run_kernel(kernel, out[i:i + rows],
+                        [a[i:i + rows] for a in args], aliased)
+        return out
+    pool = _pool(n_threads)
+    blocks = [pool.submit(_run_kernel, kernel, out[i:i + rows],
+                          [a[i:i + rows] for a in args], aliased)
+              for i in starts]
+    for block in blocks:
+        block.result()
+    return out
 
 
 def force_gravity_mag(m1, m2, r):
@@ -35,6 +124,8 @@ def force_gravity(m1, m2, r1, r2):
 
 
 def net_force(masses, positions, algorithm):
+    if instrument.enabled:
+        start = instrument.clock()
     forces = []
     for i, pos in enumerate(positions):
         f = np.zeros(3)
@@ -43,46 +134,94 @@ def net_force(masses, positions, algorithm):
                 f += algorithm(masses[i], masses[j], pos, posj)
         forces.append(f)
     forces = np.array(forces)
+    if instrument.enabled:
+        instrument.add_time("net_force", instrument.clock() - start)
+        instrument.count("force_evaluations")
+        instrument.count("pair_interactions", len(forces) * (len(forces) - 1))
     return forces
 
 
-def leapfrog(masses, ipositions, ivelocities, dt, algorithm):
-    """Computes a leapfrog iteration"""
+def leapfrog(masses, ipositions, ivelocities, dt, algorithm,
+             backend=net_force):
+    """Computes a leapfrog iteration. backend computes the forces from
+    (masses, positions, algorithm), by default by direct summation with
+    net_force"""
+    if instrument.enabled:
+        start = instrument.clock()
 
-    iaccels = net_force(masses, ipositions, algorithm)
+    iaccels = backend(masses, ipositions, algorithm)
     v_half = ivelocities + iaccels * 0.5 * dt
     fpositions = ipositions + v_half * dt
-    faccels = net_force(masses, fpositions, algorithm)
+    faccels = backend(masses, fpositions, algorithm)
     fvelocities = v_half + faccels * 0.5 * dt
 
+    if instrument.enabled:
+        instrument.add_time("leapfrog", instrument.clock() - start)
+        instrument.count("steps")
     return fpositions, fvelocities
 
 
-def calculate_trajectories(masses, ipositions, ivelocities, t, dt, algorithm):
-    """An n-body simulation calculated using algorithm function.
+def calculate_trajectories(masses, ipositions, ivelocities, t, dt, algorithm,
+                           backend=net_force, radii=None):
+    """An n-body simulation calculated using algorithm function. The forces
+    are summed by backend, net_force by default, or another function with the
+    same signature such as pm_force.
+
+    If radii are given, overlapping bodies are merged after every step with
+    merge_collisions, conserving mass and momentum. Merged bodies are dropped
+    from the simulation, so later steps get cheaper, and their rows of the
+    returned positions and velocities are NaN from then on.
 
     Returns:
         Positions: An array of shape ntimes*nbodies*ndim
         Velocities: An array of the same shape
         Times: An array of times of shape ntimes
+        Merges: Only if radii are given, a list of dicts of the time,
+            survivor, absorbed and mass of each merger
     """
+    if instrument.enabled:
+        start = instrument.clock()
     n_times = int(t/dt)
     times = np.linspace(0., t, n_times + 1)
     positions = [ipositions]
     velocities = [ivelocities]
+    pos, vel = ipositions, ivelocities
+    if radii is not None:
+        from .collisions import merge_collisions
+        n_bodies = len(masses)
+        masses = np.array(masses, dtype=float)
+        radii = np.array(radii, dtype=float)
+        ids = np.arange(n_bodies)
+        merges = []
 
     for i, time in enumerate(times):
-        pos, vel = leapfrog(masses, positions[i], velocities[i], dt, algorithm)
-        positions.append(pos)
-        velocities.append(vel)
-
-    positions = np.array(positions)
-    velocities = np.array(velocities)
-
+        pos, vel = leapfrog(masses, pos, vel, dt, algorithm, backend)
+        if radii is None:
+            positions.append(pos)
+            velocities.append(vel)
+            continue
+        masses, pos, vel, radii, ids = merge_collisions(
+            masses, pos, vel, radii, ids, time + dt, merges)
+        positions.append(np.full((n_bodies, pos.shape[1]), np.nan))
+        velocities.append(np.full((n_bodies, vel.shape[1]), np.nan))
+        positions[-1][ids] = pos
+        velocities[-1][ids] = vel
+
+    with instrument.timed("history"):
+        positions = np.array(positions)
+        velocities = np.array(velocities)
+
+    if instrument.enabled:
+        instrument.add_time("calculate_trajectories",
+                            instrument.clock() - start)
+    if radii is not None:
+        return positions, velocities, times, merges
     return positions, velocities, times
 
 
 def calculate_energy(masses, positions, velocities):
+    if instrument.enabled:
+        start = instrument.clock()
     u_tot = 0.
     for i, pos in enumerate(positions):
         for j, posj in enumerate(positions):
@@ -90,8 +229,78 @@ def calculate_energy(masses, positions, velocities):
                 u_tot -= G * masses[i] * masses[j] / mag(pos-posj)
         u_tot += 0.5 * masses[i] * mag(velocities[i])**2
 
+    if instrument.enabled:
+        instrument.add_time("calculate_energy", instrument.clock() - start)
+        instrument.count("energy_evaluations")
     return u_tot
 
+
+def _orbital_elements_chunk(r, v, mu):
+    """Keplerian elements of relative positions and velocities r, v of shape
+    (..., 3) about a primary with gravitational parameter mu"""
+    r_mag = mag(r, axis=-1)
+    h = np.cross(r, v)
+    h_hat = unit(h, axis=-1)
+    e_vec = np.cross(v, h) / mu[..., np.newaxis] - r / r_mag[..., np.newaxis]
+    e = mag(e_vec, axis=-1)
+    a = 1 / (2 / r_mag - np.sum(v ** 2, axis=-1) / mu)
+    inc = np.arccos(np.clip(h_hat[..., 2], -1, 1))
+    # The ascending node is along z x h
+    node = np.stack([-h[..., 1], h[..., 0], np.zeros_like(r_mag)], axis=-1)
+    node_mag = mag(node, axis=-1)
+    equatorial = node_mag == 0
+    node[equatorial, 0] = 1.
+    raan = np.arctan2(node[..., 1], node[..., 0]) % tau
+    arg_peri = np.arctan2(np.sum(np.cross(node, e_vec) * h_hat, axis=-1),
+                          np.sum(node * e_vec, axis=-1)) % tau
+    true_anom = np.arctan2(np.sum(np.cross(e_vec, r) * h_hat, axis=-1),
+                           np.sum(e_vec * r, axis=-1))
+    with np.errstate(invalid="ignore"):
+        ecc_anom = 2 * np.arctan(np.sqrt((1 - e) / (1 + e))
+                                 * np.tan(true_anom / 2))
+    mean_anom = (ecc_anom - e * np.sin(ecc_anom)) % tau
+    return a, e, inc, raan, arg_peri, mean_anom
+
+
+def orbital_elements(positions, velocities, masses, primary=0,
+                     chunk_size=1024):
+    """Computes the Keplerian orbital elements of every body about a primary
+    at every time of a run of calculate_trajectories, in chunks of snapshots
+    so the temporaries stay small.
+
+    Inputs:
+    positions: (array) Positions of shape ntimes*nbodies*3, in SI
+    velocities: (array) Velocities of the same shape
+    masses: (array) Masses of shape nbodies
+    primary: (int) The index of the body the orbits are about
+    chunk_size: (int) Number of snapshots to compute at once
+
+    Returns:
+    A dict of arrays of shape ntimes*nbodies, "a" the semi-major axis, "e" the
+    eccentricity, and in radians "i" the inclination, "Omega" the longitude of
+    the ascending node, "omega" the argument of periapsis, and "M" the mean
+    anomaly. The primary is NaN, and M is NaN for unbound orbits. For
+    equatorial orbits Omega is 0 and omega is measured from the x axis.
+    """
+    positions = np.asarray(positions, dtype=float)
+    velocities = np.asarray(velocities, dtype=float)
+    masses = np.asarray(masses, dtype=float)
+    mu = G * (masses[primary] + masses)
+    names = ("a", "e", "i", "Omega", "omega", "M")
+    elements = {name: np.empty(positions.shape[:2]) for name in names}
+    for start in range(0, len(positions), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        r = positions[chunk] - positions[chunk, primary, np.newaxis]
+        v = velocities[chunk] - velocities[chunk, primary, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = _orbital_elements_chunk(r, v, np.broadcast_to(
+                mu, r.shape[:2]))
+        for name, value in zip(names, values):
+            elements[name][chunk] = value
+    for name in names:
+        elements[name][:, primary] = np.nan
+    return elements
+
 def force_electric_mag(q1, q2, r):
     """Calculates the force magnitude between two particles q1 and q2 at a
     distance r according to Coulomb"s Law, all units in SI.
@@ -123,45 +332,92 @@ def force_electrostatic(q1, q2, r1, r2):
     return force_vec
 
 
-def stefan_boltzmann(t):
-    """The Power per unit area of a blackbody. All units SI"""
-    return sigma * t ** 4
+def _stefan_boltzmann_kernel(o, t):
+    np.square(t, out=o)
+    np.square(o, out=o)
+    o *= sigma
+
+
+def stefan_boltzmann(t, out=None, chunk_size=None, n_threads=None):
+    """The Power per unit area of a blackbody. All units SI. Arrays are
+    evaluated in blocks of chunk_size elements on n_threads threads,
+    optionally into out"""
+    return _evaluate(_stefan_boltzmann_kernel, (t,), out, chunk_size,
+                     n_threads)
 
 
-def luminosity_star(r, t):
+def _luminosity_star_kernel(o, r, t):
+    np.square(t, out=o)
+    np.square(o, out=o)
+    o *= r
+    o *= r
+    o *= 4 * np.pi * sigma
+
+
+def luminosity_star(r, t, out=None, chunk_size=None, n_threads=None):
     """The luminosity of a star, derived from the Stefan-Boltzmann Law.
-    All units SI"""
-    return 4 * np.pi * r ** 2 * sigma * t ** 4
+    All units SI. Arrays are evaluated in blocks of chunk_size elements on
+    n_threads threads, optionally into out"""
+    return _evaluate(_luminosity_star_kernel, (r, t), out, chunk_size,
+                     n_threads)
 
 
-def wien(t):
-    """The peak wavelength of a blackbody. Input in Kelvins, output in nm"""
-    return 2.9e6 / t
+def _wien_kernel(o, t):
+    np.divide(2.9e6, t, out=o)
 
 
-def escape_velocity(m, r):
-    """The escape velocity of an object at a distance r from a body with mass M.
-    All units SI"""
-    return np.sqrt(2 * G * m / r)
+def wien(t, out=None, chunk_size=None, n_threads=None):
+    """The peak wavelength of a blackbody. Input in Kelvins, output in nm.
+    Arrays are evaluated in blocks of chunk_size elements on n_threads
+    threads, optionally into out"""
+    return _evaluate(_wien_kernel, (t,), out, chunk_size, n_threads)
 
 
-def planck(w, temp=5800):
+def _escape_velocity_kernel(o, m, r):
+    np.divide(m, r, out=o)
+    o *= 2 * G
+    np.sqrt(o, out=o)
+
+
+def escape_velocity(m, r, out=None, chunk_size=None, n_threads=None):
+    """The escape velocity of an object at a distance r from a body with mass M.
+    All units SI. Arrays are evaluated in blocks of chunk_size elements on
+    n_threads threads, optionally into out"""
+    return _evaluate(_escape_velocity_kernel, (m, r), out, chunk_size,
+                     n_threads)
+
+
+def _planck_kernel(o, w, temp):
+    # o = h c / (w k T), with w converted from nm
+    np.multiply(w, temp, out=o)
+    np.reciprocal(o, out=o)
+    o *= h * c / kb * 1e9
+    np.expm1(o, out=o)
+    for i in range(5):
+        o *= w
+    o *= 1e-45
+    np.reciprocal(o, out=o)
+    o *= 2 * h * c ** 2
+
+
+def planck(w, temp=5800, out=None, chunk_size=None, n_threads=None):
     """Computes the Flux of a star at a given wavelength in W/m^2 Input
     wavelength is in nm Temperature is by default 5800, but can be set to any
     value as the second input
 
     Inputs:
     w: (float) The wavelength in nm
+    temp: (float) The temperature in Kelvins, may be an array that
+        broadcasts with w
+    out: (array) An optional output array
+    chunk_size: (int) Arrays are evaluated in blocks of this many elements
+    n_threads: (int) Number of threads for the blocks, one per CPU by default
     Returns:
     brightness: (float) The planck function in units of W/m^3
     """
-    assert temp != 0, "Temperature cannot be zero"
-    temp = temp * 1.0
-    w = w * 1e-9
-    num = 2 * h * c ** 2
-    den = w ** 5 * (np.exp(h * c / (w * kb * temp)) - 1)
-    brightness = num / den
-    return brightness
+    assert np.all(np.asarray(temp) != 0), "Temperature cannot be zero"
+    return _evaluate(_planck_kernel, (w, temp), out, chunk_size,
+                     n_threads)
 
 
 def integrate_spectrum(wavelengths, fluxes, w_lower, w_upper):
@@ -232,37 +488,52 @@ def estimate_rgb(wavelengths, fluxes):
     return rgb
 
 
-def lorentz(v):
+def _lorentz_kernel(o, v):
+    np.square(v, out=o)
+    np.subtract(1, o, out=o)
+    np.sqrt(o, out=o)
+    np.reciprocal(o, out=o)
+
+
+def lorentz(v, out=None, chunk_size=None, n_threads=None):
     """Calculates the time dilation factor given a velocity as a factor of c.
 
     Inputs:
-    v: A factor of the speed of light, units of "c"
+    v: A factor of the speed of light, units of "c", or an array of them
+    out: (array) An optional output array
+    chunk_size: (int) Arrays are evaluated in blocks of this many elements
+    n_threads: (int) Number of threads for the blocks, one per CPU by default
 
     Output:
     a lorentz multiple, greater than 1, no units.
     """
 
-    assert (np.abs(v) < 1)
-    return 1 / np.sqrt(1 - v ** 2)
+    assert np.all(np.abs(v) < 1), "Velocities must be less than c"
+    return _evaluate(_lorentz_kernel, (v,), out, chunk_size,
+                     n_threads)
 
 
-def mag(a):
+def mag(a, axis=None, keepdims=False):
     """This is a simple function to find the magnitude of any vector.
 
     :param a: (array or list) The list to be calculated for magnitude.
     1D, any length
+    :param axis: (int) The axis of the vector components, for arrays of many
+    vectors. By default the whole array is one vector.
+    :param keepdims: (bool) Keep the summed axis with length 1
     :return: Magnitude of a
     """
-    a = np.array(a)
-    magnitude = np.sqrt(np.sum(a**2))
+    a = np.asarray(a)
+    magnitude = np.sqrt(np.sum(a**2, axis=axis, keepdims=keepdims))
     return magnitude
 
 
-def unit(a):
+def unit(a, axis=None):
     """This is a function dependent on mag(a) to create a unit Vector.
     :param a: (array) The input to be converted to a unit vector.
     1D, any length
+    :param axis: (int) The axis of the vector components, see mag
     :return: A unit vector for a
     """
-    unit_vector = a / mag(a)
+    unit_vector = a / mag(a, axis=axis, keepdims=axis is not None)
     return unit_vector
\ No newline at end of file
@@ -1,3 +1,7 @@
+"""Color palettes and helpers for drawing large n-body runs"""
+
+import numpy as np
+
 blue = (0.266, 0.466, 0.666)
 cyan = (0.4, 0.8, 0.933)
 green = (0.133, 0.533, 0.2)
@@ -15,3 +19,121 @@ vmagenta = (0.933, 0.2, 0.466)
 vgray = (0.733, 0.733, 0.733)
 vibrant = (vblue, vorange, vred, vteal, vmagenta, vgray)
 lime = (0.386, 0.773, 0.238)
+
+
+def lttb(x, y, n_out):
+    """Picks the points of a line that best keep its shape with the
+    Largest-Triangle-Three-Buckets algorithm. The points are split into
+    n_out - 2 buckets by index, and from each the point forming the largest
+    triangle with the previous pick and the mean of the next bucket is kept.
+    x does not have to increase, so this also works on a path in the x-y
+    plane.
+
+    Inputs:
+    x: (array) The x coordinates, of length N
+    y: (array) The y coordinates, of length N
+    n_out: (int) The number of points to keep, raised to 3 if smaller
+
+    Returns:
+    An array of the indices of the kept points, in order
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    n_out = max(n_out, 3)
+    if n <= n_out:
+        return np.arange(n)
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0] = 0
+    kept[-1] = n - 1
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            next_x = x[stop:bounds[i + 2]].mean()
+            next_y = y[stop:bounds[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = kept[i]
+        area = np.abs((x[a] - next_x) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (next_y - y[a]))
+        kept[i + 1] = start + np.argmax(area)
+    return kept
+
+
+def minmax_decimate(y, n_bins):
+    """Keeps the first, smallest, largest and last value of y in each of
+    n_bins buckets, which is all that a line can show in one pixel column.
+    :param y: (array) The values, of length N
+    :param n_bins: (int) The number of buckets, usually the width in pixels
+    :return: An array of the indices of the kept points, in order
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 4 * n_bins:
+        return np.arange(n)
+    per_bin = n // n_bins
+    used = per_bin * n_bins
+    buckets = y[:used].reshape(n_bins, per_bin)
+    offsets = np.arange(n_bins)[:, np.newaxis] * per_bin
+    kept = np.concatenate([
+        (offsets + np.argmin(buckets, axis=1)[:, np.newaxis]).ravel(),
+        (offsets + np.argmax(buckets, axis=1)[:, np.newaxis]).ravel(),
+        offsets.ravel(), offsets.ravel() + per_bin - 1,
+        np.arange(used, n)])
+    return np.unique(kept)
+
+
+def decimate_path(x, y, n_points, method="lttb"):
+    """Decimates a path to about n_points points
+    :param x: (array) The x coordinates
+    :param y: (array) The y coordinates
+    :param n_points: (int) Roughly how many points to keep
+    :param method: (str) "lttb", or "minmax" to keep the extremes of both x
+        and y in each of n_points / 4 buckets
+    :return: An array of the indices of the kept points, in order
+    """
+    if method == "lttb":
+        return lttb(x, y, n_points)
+    elif method == "minmax":
+        n_bins = max(1, n_points // 4)
+        return np.union1d(minmax_decimate(x, n_bins),
+                          minmax_decimate(y, n_bins))
+    raise ValueError("method must be 'lttb' or 'minmax', not {!r}"
+                     "".format(method))
+
+
+def plot_trajectories(positions, ax=None, n_points=2000, method="lttb",
+                      palette=bright, dims=(0, 1), **kwargs):
+    """Draws the path of every body in a run of calculate_trajectories,
+    decimated to about n_points points each, so drawing takes about the same
+    time however long the run was. The last position of each body is marked.
+
+    Inputs:
+    positions: (array) Positions of shape ntimes*nbodies*ndim
+    ax: (Axes) The matplotlib axes to draw on, by default the current axes
+    n_points: (int) Roughly how many points to draw per body
+    method: (str) "lttb" or "minmax", see decimate_path
+    palette: (tuple) Colors to cycle through, such as bright or vibrant
+    dims: (tuple) Which two coordinates to draw
+    kwargs: Passed on to ax.plot
+
+    Returns:
+    The matplotlib axes
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.gca()
+    positions = np.asarray(positions)
+    for body in range(positions.shape[1]):
+        x = positions[:, body, dims[0]]
+        y = positions[:, body, dims[1]]
+        finite = np.isfinite(x) & np.isfinite(y)
+        x, y = x[finite], y[finite]
+        if len(x) == 0:
+            continue
+        kept = decimate_path(x, y, n_points, method)
+        color = palette[body % len(palette)]
+        ax.plot(x[kept], y[kept], color=color, **kwargs)
+        ax.scatter(x[-1:], y[-1:], color=[color])
+    return ax
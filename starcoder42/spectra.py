@@ -0,0 +1,92 @@
+"""Flux-conserving resampling of spectra onto a common wavelength grid. The
+overlap between every input bin and every output bin is found once, stored
+sparsely, and cached, so resampling a batch of spectra on the same grids is a
+single gather and sum."""
+
+import numpy as np
+
+rebin_cache_size = 32
+_rebin_cache = {}
+
+
+def bin_edges(wavelengths):
+    """Finds the edges of the bins centered on each wavelength, halfway between
+    neighbors, with the outer bins as wide as their neighbors
+    :param wavelengths: (array) Increasing bin centers of length N
+    :return: (array) Bin edges of length N + 1
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    assert wavelengths.size > 1, "At least two wavelengths are needed"
+    assert np.all(np.diff(wavelengths) > 0), "Wavelengths must be increasing"
+    edges = np.empty(len(wavelengths) + 1)
+    edges[1:-1] = (wavelengths[1:] + wavelengths[:-1]) / 2
+    edges[0] = 2 * wavelengths[0] - edges[1]
+    edges[-1] = 2 * wavelengths[-1] - edges[-2]
+    return edges
+
+
+def rebin_matrix(wavelengths_in, wavelengths_out):
+    """Builds the sparse matrix that resamples spectra from one wavelength grid
+    onto another while conserving the integrated flux. Entry (k, j) is the
+    fraction of output bin k covered by input bin j. Results are cached, so
+    calling this again with the same grids is free.
+
+    Inputs:
+    wavelengths_in: (array) Increasing bin centers of the input spectra
+    wavelengths_out: (array) Increasing bin centers of the output grid
+
+    Returns:
+    rows, cols, weights: (arrays) The nonzero entries of the matrix, sorted
+        by row
+    n_out: (int) The number of output bins
+    """
+    wavelengths_in = np.asarray(wavelengths_in, dtype=float)
+    wavelengths_out = np.asarray(wavelengths_out, dtype=float)
+    key = (wavelengths_in.tobytes(), wavelengths_out.tobytes())
+    if key in _rebin_cache:
+        return _rebin_cache[key]
+    edges_in = bin_edges(wavelengths_in)
+    edges_out = bin_edges(wavelengths_out)
+    # Every segment between consecutive edges of either grid lies in exactly
+    # one input bin and one output bin
+    edges = np.union1d(edges_in, edges_out)
+    middles = (edges[1:] + edges[:-1]) / 2
+    cols = np.searchsorted(edges_in, middles) - 1
+    rows = np.searchsorted(edges_out, middles) - 1
+    inside = (cols >= 0) & (cols < len(wavelengths_in)) \
+        & (rows >= 0) & (rows < len(wavelengths_out))
+    rows = rows[inside]
+    cols = cols[inside]
+    weights = np.diff(edges)[inside] / np.diff(edges_out)[rows]
+    matrix = rows, cols, weights, len(wavelengths_out)
+    if len(_rebin_cache) >= rebin_cache_size:
+        del _rebin_cache[next(iter(_rebin_cache))]
+    _rebin_cache[key] = matrix
+    return matrix
+
+
+def rebin_spectra(wavelengths_in, fluxes, wavelengths_out):
+    """Resamples one or many spectra onto a new wavelength grid, conserving
+    the integrated flux. Output bins that reach past the input grid are
+    treated as having zero flux there.
+
+    Inputs:
+    wavelengths_in: (array) Increasing bin centers of length N
+    fluxes: (array) Flux densities of shape (..., N), any number of spectra
+    wavelengths_out: (array) Increasing bin centers of length M
+
+    Returns:
+    An array of flux densities of shape (..., M)
+    """
+    rows, cols, weights, n_out = rebin_matrix(wavelengths_in,
+                                              wavelengths_out)
+    fluxes = np.asarray(fluxes, dtype=float)
+    rebinned = np.zeros(fluxes.shape[:-1] + (n_out,))
+    if len(rows) == 0:
+        return rebinned
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    contributions = fluxes[..., cols]
+    contributions *= weights
+    rebinned[..., rows[starts]] = np.add.reduceat(contributions, starts,
+                                                  axis=-1)
+    return rebinned
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+class Collisions(unittest.TestCase):
+    def test_merge(self):
+        masses = np.array([3., 1., 1.])
+        positions = np.array([[0., 0., 0.], [0.5, 0., 0.], [10., 0., 0.]])
+        velocities = np.array([[1., 0., 0.], [-1., 0., 0.], [0., 1., 0.]])
+        radii = np.array([0.3, 0.3, 0.3])
+        ids = np.arange(3)
+        momentum = (masses[:, np.newaxis] * velocities).sum(axis=0)
+        merges = []
+        masses, positions, velocities, radii, ids = s.merge_collisions(
+            masses, positions, velocities, radii, ids, 1., merges)
+        self.assertEqual(list(ids), [0, 2])
+        self.assertEqual(list(masses), [4., 1.])
+        np.testing.assert_allclose(
+            (masses[:, np.newaxis] * velocities).sum(axis=0), momentum)
+        np.testing.assert_allclose(positions[0], [0.125, 0., 0.])
+        self.assertAlmostEqual(radii[0], np.cbrt(2 * 0.3 ** 3))
+        self.assertEqual(merges, [{"time": 1., "survivor": 0, "absorbed": 1,
+                                   "mass": 4.}])
+
+    def test_one_merge_per_body(self):
+        masses = np.array([1., 1., 1.])
+        positions = np.array([[0., 0., 0.], [0.1, 0., 0.], [0.2, 0., 0.]])
+        velocities = np.zeros((3, 3))
+        radii = np.full(3, 0.5)
+        merges = []
+        masses, positions, velocities, radii, ids = s.merge_collisions(
+            masses, positions, velocities, radii, np.arange(3), 0., merges)
+        self.assertEqual(len(merges), 1)
+        self.assertEqual(len(ids), 2)
+        merges = []
+        masses, positions, velocities, radii, ids = s.merge_collisions(
+            masses, positions, velocities, radii, ids, 1., merges)
+        self.assertEqual(len(merges), 1)
+        self.assertEqual(list(masses), [3.])
+
+    def test_realistic_scale(self):
+        rng = np.random.default_rng(42)
+        positions = rng.random((100, 3)) * 10 * s.distances["AU"]
+        positions[1] = positions[0] + [1e5, 0., 0.]
+        radii = np.full(100, 1e5)
+        i, j = s.find_collisions(positions, radii)
+        self.assertEqual(list(zip(i, j)), [(0, 1)])
+
+    def test_trajectories(self):
+        masses = [1e3, 1e3, 1e3]
+        ipositions = np.array([[0., 0., 0.], [1., 0., 0.], [50., 0., 0.]])
+        ivelocities = np.array([[0.1, 0., 0.], [-0.1, 0., 0.], [0., 0., 0.]])
+        positions, velocities, times, merges = s.calculate_trajectories(
+            masses, ipositions, ivelocities, 10., 1., s.force_gravity,
+            radii=[0.2, 0.2, 0.2])
+        self.assertEqual(len(merges), 1)
+        self.assertEqual(positions.shape, (12, 3, 3))
+        self.assertTrue(np.all(np.isnan(positions[-1, 1])))
+        self.assertFalse(np.any(np.isnan(positions[-1, [0, 2]])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+class UnitConversion(unittest.TestCase):
+    def test_factor(self):
+        scale, offset = s.conversion("Parsecs", "AU")
+        self.assertAlmostEqual(scale, s.distances["Parsecs"]
+                               / s.distances["AU"])
+        self.assertEqual(offset, 0)
+
+    def test_compound(self):
+        speed = s.convert(np.array([36., 72.]), "Kilometers/Hours",
+                          "Meters/Seconds")
+        np.testing.assert_allclose(speed, [10., 20.])
+        self.assertAlmostEqual(s.convert(1., "Ergs",
+                                         "Kilograms*Meters^2/Seconds^2"),
+                               1e-7)
+
+    def test_inplace(self):
+        temps = np.array([32., 212.])
+        result = s.convert(temps, "Fahrenheit", "Celsius", inplace=True)
+        self.assertIs(result, temps)
+        np.testing.assert_allclose(temps, [0., 100.], atol=1e-12)
+
+    def test_out(self):
+        out = np.empty(2)
+        s.convert([1., 2.], "Years", "Days", out=out)
+        np.testing.assert_allclose(out, [365., 730.])
+
+    def test_dimensions(self):
+        with self.assertRaises(ValueError):
+            s.conversion("Parsecs", "Years")
+        with self.assertRaises(ValueError):
+            s.conversion("Kelvin", "Meters")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+class Elementwise(unittest.TestCase):
+    def setUp(self):
+        self.temps = np.linspace(3000., 30000., 1001)
+
+    def test_chunks_match(self):
+        whole = s.stefan_boltzmann(self.temps)
+        np.testing.assert_allclose(whole, s.sigma * self.temps ** 4)
+        np.testing.assert_allclose(
+            s.stefan_boltzmann(self.temps, chunk_size=64), whole)
+        np.testing.assert_allclose(
+            s.luminosity_star(7e8, self.temps, chunk_size=64),
+            4 * np.pi * 7e8 ** 2 * whole)
+
+    def test_threads(self):
+        expected = s.planck(500., self.temps)
+        for n_threads in (1, 4):
+            np.testing.assert_allclose(
+                s.planck(500., self.temps, chunk_size=64,
+                         n_threads=n_threads), expected)
+        self.assertFalse(hasattr(s, "n_threads"))
+
+    def test_out(self):
+        out = np.empty_like(self.temps)
+        result = s.wien(self.temps, out=out, chunk_size=100)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out, 2.9e6 / self.temps)
+
+    def test_out_aliases_input(self):
+        wavelengths = np.linspace(400., 700., 1000)
+        expected = s.planck(wavelengths)
+        result = s.planck(wavelengths, out=wavelengths, chunk_size=64)
+        self.assertIs(result, wavelengths)
+        np.testing.assert_allclose(wavelengths, expected)
+        radii = np.full_like(self.temps, 7e8)
+        expected = s.luminosity_star(radii, self.temps)
+        s.luminosity_star(radii, self.temps, out=radii)
+        np.testing.assert_allclose(radii, expected)
+        temps = self.temps.copy()
+        s.stefan_boltzmann(temps[::-1], out=temps, chunk_size=64)
+        np.testing.assert_allclose(temps, s.sigma * self.temps[::-1] ** 4)
+
+    def test_planck_broadcast(self):
+        wavelengths = np.linspace(400., 700., 30)
+        grid = s.planck(wavelengths, self.temps[:, np.newaxis],
+                        chunk_size=100)
+        self.assertEqual(grid.shape, (1001, 30))
+        np.testing.assert_allclose(grid[10], s.planck(wavelengths,
+                                                      self.temps[10]))
+
+    def test_lorentz_array(self):
+        v = np.array([0., 0.6, -0.8])
+        np.testing.assert_allclose(s.lorentz(v), [1., 1.25, 5 / 3])
+        self.assertAlmostEqual(s.lorentz(0.6), 1.25)
+        with self.assertRaises(AssertionError):
+            s.lorentz(np.array([0.5, 1.]))
+
+
+if __name__ == '__main__':
+    unittest.main()
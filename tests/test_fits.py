@@ -0,0 +1,97 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import starcoder42 as s
+
+
+def card(key, value=None):
+    if value is None:
+        return "{:<80}".format(key)
+    return "{:<8}= {:>20}".format(key, value).ljust(80)
+
+
+def header_bytes(cards):
+    text = "".join(cards) + card("END")
+    text += " " * (-len(text) % 2880)
+    return text.encode("ascii")
+
+
+def data_bytes(array):
+    raw = array.tobytes()
+    return raw + b"\0" * (-len(raw) % 2880)
+
+
+class FitsReader(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "test.fits"
+        self.image = np.arange(12, dtype=">f4").reshape(3, 4)
+        self.table = np.array([(1, 2.5), (2, 3.5)],
+                              dtype=[("ID", ">i4"), ("FLUX", ">f8")])
+        primary = header_bytes([card("SIMPLE", "T"), card("BITPIX", -32),
+                                card("NAXIS", 2), card("NAXIS1", 4),
+                                card("NAXIS2", 3), card("OBJECT", "'M31'"),
+                                card("HISTORY   reduced"),
+                                card("NOTE", "'Andromeda &'"),
+                                card("CONTINUE  'Galaxy'")])
+        table = header_bytes([card("XTENSION", "'BINTABLE'"),
+                              card("BITPIX", 8), card("NAXIS", 2),
+                              card("NAXIS1", 12), card("NAXIS2", 2),
+                              card("PCOUNT", 0), card("GCOUNT", 1),
+                              card("TFIELDS", 2),
+                              card("TTYPE1", "'ID'"), card("TFORM1", "'J'"),
+                              card("TTYPE2", "'FLUX'"),
+                              card("TFORM2", "'D'")])
+        with self.path.open("wb") as f:
+            f.write(primary + data_bytes(self.image))
+            f.write(table + data_bytes(self.table))
+
+    def tearDown(self):
+        s.clear_header_cache()
+        self.dir.cleanup()
+
+    def test_header(self):
+        header = s.read_header(self.path)
+        self.assertEqual(header["NAXIS1"], 4)
+        self.assertEqual(header["OBJECT"], "M31")
+        self.assertIs(header["SIMPLE"], True)
+        self.assertEqual(header["HISTORY"], ["  reduced"])
+        self.assertEqual(header["NOTE"], "Andromeda Galaxy")
+
+    def test_image(self):
+        data = s.read_data(self.path)
+        self.assertIsInstance(data, np.memmap)
+        np.testing.assert_array_equal(data, self.image)
+
+    def test_table(self):
+        header, data = s.read_fits(self.path, hdu=1)
+        self.assertEqual(header["XTENSION"], "BINTABLE")
+        np.testing.assert_array_equal(data["ID"], [1, 2])
+        np.testing.assert_array_equal(data["FLUX"], [2.5, 3.5])
+
+    def test_scan(self):
+        index = s.scan_headers(self.dir.name)
+        self.assertEqual(list(index), [self.path])
+        self.assertIs(s.scan_headers(self.dir.name)[self.path],
+                      index[self.path])
+
+    def test_scan_skips_bad_files(self):
+        bad = Path(self.dir.name) / "bad.fits"
+        bad.write_bytes(b"")
+        index = s.scan_headers(self.dir.name)
+        self.assertIsNone(index[bad])
+        self.assertEqual(index[self.path]["NAXIS1"], 4)
+
+    def test_leading_continue(self):
+        path = Path(self.dir.name) / "continue.fits"
+        path.write_bytes(header_bytes([card("CONTINUE  'stray'"),
+                                       card("SIMPLE", "T"),
+                                       card("NAXIS", 0)]))
+        self.assertEqual(s.read_header(path),
+                         {"SIMPLE": True, "NAXIS": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+class Instrumentation(unittest.TestCase):
+    def setUp(self):
+        self.masses = [s.m_earth, 70]
+        self.positions = np.array([[0., 0., 0.],
+                                   [0., s.distances['EarthRadii'], 0.]])
+        self.velocities = np.zeros((2, 3))
+
+    def test_disabled(self):
+        s.instrument.reset()
+        s.calculate_trajectories(self.masses, self.positions,
+                                 self.velocities, 1., 0.1, s.force_gravity)
+        self.assertFalse(s.instrument.enabled)
+        self.assertEqual(s.instrument.report()["counters"], {})
+
+    def test_profiling(self):
+        with s.instrument.profiling() as stats:
+            s.calculate_trajectories(self.masses, self.positions,
+                                     self.velocities, 1., 0.1,
+                                     s.force_gravity)
+        report = stats()
+        self.assertEqual(report["counters"]["steps"], 11)
+        self.assertEqual(report["counters"]["force_evaluations"], 22)
+        self.assertEqual(report["counters"]["pair_interactions"], 44)
+        self.assertIn("steps_per_second", report["rates"])
+        self.assertFalse(s.instrument.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+def brute_pairs(positions, cutoff, box_size=None):
+    i, j = np.triu_indices(len(positions), 1)
+    d = positions[j] - positions[i]
+    if box_size is not None:
+        d -= box_size * np.round(d / box_size)
+    close = np.linalg.norm(d, axis=1) < cutoff
+    return set(zip(i[close], j[close]))
+
+
+class NeighborList(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.positions = rng.random((200, 3)) * 10.
+        self.charges = rng.normal(size=200) * 1e-9
+
+    def test_pairs(self):
+        for box_size in (None, 10., 4.):
+            positions = self.positions if box_size is None \
+                else self.positions % box_size
+            i, j = s.cell_list_pairs(positions, 2., box_size)
+            self.assertEqual(set(zip(i, j)),
+                             brute_pairs(positions, 2., box_size))
+
+    def test_sparse_pairs(self):
+        positions = self.positions * 100.
+        positions[0] = 1e6
+        positions[1] = positions[0] + 0.5
+        i, j = s.cell_list_pairs(positions, 1.)
+        self.assertEqual(set(zip(i, j)), brute_pairs(positions, 1.))
+        self.assertIn((0, 1), set(zip(i, j)))
+        i, j = s.cell_list_pairs(positions % 1e4, 1., box_size=1e4)
+        self.assertEqual(set(zip(i, j)),
+                         brute_pairs(positions % 1e4, 1., 1e4))
+
+    def test_matches_net_force(self):
+        positions = self.positions[:20]
+        charges = self.charges[:20]
+        forces = s.NeighborList(100.)(charges, positions)
+        direct = s.net_force(charges, positions, s.force_electrostatic)
+        np.testing.assert_allclose(forces, direct, rtol=1e-8)
+
+    def test_lazy_rebuild(self):
+        backend = s.NeighborList(2., skin=0.5)
+        backend(self.charges, self.positions)
+        backend(self.charges, self.positions + 0.1)
+        self.assertEqual(backend.n_builds, 1)
+        backend(self.charges, self.positions + 0.3)
+        self.assertEqual(backend.n_builds, 2)
+
+    def test_instrumented(self):
+        backend = s.NeighborList(2., skin=0.5)
+        with s.instrument.profiling() as stats:
+            s.calculate_trajectories(self.charges, self.positions,
+                                     np.zeros_like(self.positions), 1., 1.,
+                                     None, backend=backend)
+        report = stats()
+        self.assertEqual(report["counters"]["force_evaluations"], 4)
+        self.assertIn("net_force", report["timers"])
+        self.assertIn("neighbor_build", report["timers"])
+        self.assertIn("pairs_per_second", report["rates"])
+
+
+if __name__ == '__main__':
+    unittest.main()
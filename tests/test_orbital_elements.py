@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+def rotation(axis, angle):
+    c, sn = np.cos(angle), np.sin(angle)
+    if axis == "z":
+        return np.array([[c, -sn, 0], [sn, c, 0], [0, 0, 1]])
+    return np.array([[1, 0, 0], [0, c, -sn], [0, sn, c]])
+
+
+class OrbitalElements(unittest.TestCase):
+    def test_known_orbit(self):
+        a, e, inc, raan, arg_peri = s.distances["AU"], 0.1, 0.3, 1.0, 0.5
+        masses = [s.m_sun, s.m_earth]
+        mu = s.G * (s.m_sun + s.m_earth)
+        r_peri = a * (1 - e)
+        v_peri = np.sqrt(mu * (1 + e) / r_peri)
+        rotate = rotation("z", raan) @ rotation("x", inc) \
+            @ rotation("z", arg_peri)
+        positions = np.array([[[0., 0., 0.], rotate @ [r_peri, 0., 0.]]] * 5)
+        velocities = np.array([[[0., 0., 0.], rotate @ [0., v_peri, 0.]]] * 5)
+        elements = s.orbital_elements(positions, velocities, masses,
+                                      chunk_size=2)
+        self.assertEqual(elements["a"].shape, (5, 2))
+        self.assertTrue(np.all(np.isnan(elements["e"][:, 0])))
+        np.testing.assert_allclose(elements["a"][:, 1], a)
+        np.testing.assert_allclose(elements["e"][:, 1], e)
+        np.testing.assert_allclose(elements["i"][:, 1], inc)
+        np.testing.assert_allclose(elements["Omega"][:, 1], raan)
+        np.testing.assert_allclose(elements["omega"][:, 1], arg_peri)
+        np.testing.assert_allclose(np.sin(elements["M"][:, 1]), 0.,
+                                   atol=1e-9)
+
+    def test_vector_mag(self):
+        vectors = np.array([[3., 4., 0.], [0., 0., 2.]])
+        np.testing.assert_allclose(s.mag(vectors, axis=-1), [5., 2.])
+        np.testing.assert_allclose(s.mag(s.unit(vectors, axis=-1), axis=-1),
+                                   1.)
+        self.assertAlmostEqual(s.mag([3., 4.]), 5.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import functools
+
+import numpy as np
+import starcoder42 as s
+
+
+class ParticleMesh(unittest.TestCase):
+    def setUp(self):
+        self.box_size = 1000.
+        self.masses = np.array([1e10, 1e10])
+        self.positions = np.array([[400., 500., 500.], [600., 500., 500.]])
+
+    def test_deposit(self):
+        rho = s.deposit_mass(self.masses, self.positions, self.box_size, 16)
+        cell = self.box_size / 16
+        self.assertAlmostEqual(rho.sum() * cell ** 3 / self.masses.sum(), 1.)
+
+    def test_matches_direct(self):
+        pm = s.pm_force(self.masses, self.positions, box_size=self.box_size,
+                        n_grid=64)
+        direct = s.net_force(self.masses, self.positions, s.force_gravity)
+        np.testing.assert_allclose(pm[:, 0], direct[:, 0], rtol=0.05)
+        np.testing.assert_allclose(pm.sum(axis=0), 0., atol=1e-6)
+
+    def test_backend(self):
+        backend = functools.partial(s.pm_force, box_size=self.box_size,
+                                    n_grid=16)
+        positions, velocities, times = s.calculate_trajectories(
+            self.masses, self.positions, np.zeros((2, 3)), 10., 1., None,
+            backend=backend)
+        self.assertEqual(positions.shape, (12, 2, 3))
+        self.assertTrue(positions[-1, 0, 0] > self.positions[0, 0])
+
+    def test_instrumented(self):
+        backend = functools.partial(s.pm_force, box_size=self.box_size,
+                                    n_grid=16)
+        with s.instrument.profiling() as stats:
+            s.calculate_trajectories(self.masses, self.positions,
+                                     np.zeros((2, 3)), 2., 1., None,
+                                     backend=backend)
+        report = stats()
+        self.assertEqual(report["counters"]["force_evaluations"], 6)
+        self.assertIn("pm_force", report["timers"])
+        self.assertNotIn("net_force", report["timers"])
+        self.assertEqual(report["counters"]["particles_deposited"], 12)
+        self.assertNotIn("pairs_per_second", report["rates"])
+        self.assertIn("particles_per_second", report["rates"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import starcoder42 as s
+
+
+class Decimation(unittest.TestCase):
+    def setUp(self):
+        t = np.linspace(0., 20., 100000)
+        self.x = np.cos(t)
+        self.y = np.sin(t) + np.where(np.arange(len(t)) == 12345, 5., 0.)
+
+    def test_lttb(self):
+        kept = s.lttb(self.x, self.y, 500)
+        self.assertEqual(len(kept), 500)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertEqual((kept[0], kept[-1]), (0, len(self.x) - 1))
+        self.assertIn(12345, kept)
+
+    def test_lttb_small_budget(self):
+        self.assertEqual(list(s.lttb(self.x, self.y, 1)),
+                         list(s.lttb(self.x, self.y, 3)))
+        self.assertEqual(len(s.decimate_path(self.x, self.y, 2)), 3)
+
+    def test_minmax(self):
+        kept = s.minmax_decimate(self.y, 100)
+        self.assertLessEqual(len(kept), 4 * 100 + 100)
+        self.assertIn(12345, kept)
+        self.assertEqual(self.y[kept].min(), self.y.min())
+
+    def test_plot(self):
+        positions = np.stack([self.x, self.y, np.zeros_like(self.x)], -1)
+        positions = np.stack([positions, 2 * positions], axis=1)
+        fig = plt.figure()
+        ax = s.plot_trajectories(positions, ax=fig.gca(), n_points=300,
+                                 palette=s.vibrant)
+        self.assertEqual(len(ax.lines), 2)
+        self.assertEqual(len(ax.lines[0].get_xdata()), 300)
+        self.assertEqual(ax.lines[1].get_color(), s.vorange)
+        plt.close(fig)
+
+
+if __name__ == '__main__':
+    unittest.main()
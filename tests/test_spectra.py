@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+import starcoder42 as s
+
+
+class Rebinning(unittest.TestCase):
+    def setUp(self):
+        self.wavelengths = np.linspace(300., 800., 501)
+        self.fluxes = np.stack([s.planck(self.wavelengths, temp)
+                                for temp in (3000., 5800., 10000.)])
+
+    def test_conserves_flux(self):
+        wavelengths_out = np.linspace(250., 850., 37)
+        rebinned = s.rebin_spectra(self.wavelengths, self.fluxes,
+                                   wavelengths_out)
+        self.assertEqual(rebinned.shape, (3, 37))
+        total_in = self.fluxes @ np.diff(s.bin_edges(self.wavelengths))
+        total_out = rebinned @ np.diff(s.bin_edges(wavelengths_out))
+        np.testing.assert_allclose(total_out, total_in)
+
+    def test_identity(self):
+        np.testing.assert_allclose(
+            s.rebin_spectra(self.wavelengths, self.fluxes, self.wavelengths),
+            self.fluxes)
+
+    def test_cached(self):
+        wavelengths_out = np.linspace(400., 700., 31)
+        self.assertIs(s.rebin_matrix(self.wavelengths, wavelengths_out),
+                      s.rebin_matrix(self.wavelengths,
+                                     wavelengths_out.copy()))
+
+
+if __name__ == '__main__':
+    unittest.main()